@@ -1,4 +1,4 @@
-from .logger import get_logger, LogLevel, LevelColor, DiscordLogger
+from .logger import get_logger, flush, LogLevel, LevelColor, DiscordLogger
 from .__version__ import __version__
 
-__all__ = ['get_logger', '__version__', 'DiscordLogger', 'LogLevel', 'LevelColor']
+__all__ = ['get_logger', 'flush', '__version__', 'DiscordLogger', 'LogLevel', 'LevelColor']
@@ -2,37 +2,58 @@
 """
 
 import os
-import dataclasses
-import functools
-import inspect
-import multiprocessing
+import asyncio
+import atexit
+import concurrent.futures
+import queue
+import re
+import sys
 import threading
+import time
 import warnings
 from datetime import datetime, timezone
 from enum import StrEnum, IntEnum
 from dataclasses import dataclass
-from typing import Callable, Literal
+from typing import Any, Callable, Literal
 
-from discord_webhook import DiscordWebhook, DiscordEmbed
+import httpx
 from dotenv import load_dotenv
 
 from discord_logger.__version__ import __version__
 
 _ENV_URL_KEY = "DISCORDLOGGER_WEBHOOK_URL"
 
-_sentinel = object()
-_manager = _sentinel
-
 _package_name = "Discord-Logger"
 
+_DEFAULT_QUEUE_SIZE = 1024
+_DEFAULT_BATCH_WINDOW_MS = 50
+# Timeout of a webhook execution, and maximum time spent sending the queued messages when the interpreter exits
+_HTTP_TIMEOUT_S = 5
+_EXIT_TIMEOUT_S = 10
+# Discord limits: embeds per webhook execution, characters in a message content and in all the embeds of a message
+_MAX_BATCH_SIZE = 10
+_MAX_CONTENT_LENGTH = 2000
+_MAX_EMBEDS_LENGTH = 6000
+# Discord limits of a single embed
+_MAX_DESCRIPTION_LENGTH = 4096
+_MAX_AUTHOR_LENGTH = 256
+# Fields of the webhook execution payload a logger can set, the others are set per message
+_WEBHOOK_KWARGS = frozenset({'username', 'avatar_url', 'tts', 'allowed_mentions', 'thread_name', 'flags'})
+
+
+_dotenv_found: bool | None = None
+
 
 def _get_webhook_url() -> str:
-    dotenv_found = load_dotenv()
+    global _dotenv_found
+    # Searching and parsing the .env file is only done by the first logger
+    if _dotenv_found is None:
+        _dotenv_found = load_dotenv()
     if _ENV_URL_KEY in os.environ:
         return os.environ[_ENV_URL_KEY]
 
     raise EnvironmentError(f"Could not find {_ENV_URL_KEY} in environment."
-                           f" The .env {'was' if dotenv_found else 'was not'} found."
+                           f" The .env {'was' if _dotenv_found else 'was not'} found."
                            f" Please set {_ENV_URL_KEY} with the url of the discord webhook to use"
                            f" in your environment or in a local .env file.")
 
@@ -46,6 +67,10 @@ class LogLevel(IntEnum):
     CRITICAL = 50
 
 
+_level_by_name = {level.name: level for level in LogLevel}
+_level_by_value = {level.value: level for level in LogLevel}
+
+
 class LevelColor(StrEnum):
     NOTSET = "000000"
     DEBUG = "D5EAD8"
@@ -60,26 +85,51 @@ class PayloadType(IntEnum):
     EMBEDDED = 1
 
 
-_optional_keys = ['thread_name', 'process_name', 'func_name', 'module_name', 'line_number']
+_optional_keys = ('thread_name', 'process_name', 'func_name', 'module_name', 'line_number')
+_record_keys = ('level', 'app_name', 'message', 'timestamp', *_optional_keys)
+
+# Bits of DiscordLogger._embed_mask, one per optional field
+_FLAG_THREAD_NAME = 1
+_FLAG_PROCESS_NAME = 2
+_FLAG_MODULE_NAME = 4
+_FLAG_FUNC_NAME = 8
+_FLAG_LINE_NUMBER = 16
+# Fields read from the caller frame
+_FRAME_FLAGS = _FLAG_MODULE_NAME | _FLAG_FUNC_NAME | _FLAG_LINE_NUMBER
+_ALL_FLAGS = _FLAG_THREAD_NAME | _FLAG_PROCESS_NAME | _FRAME_FLAGS
+
+_key_to_flag = {
+    'thread_name': _FLAG_THREAD_NAME,
+    'process_name': _FLAG_PROCESS_NAME,
+    'module_name': _FLAG_MODULE_NAME,
+    'func_name': _FLAG_FUNC_NAME,
+    'line_number': _FLAG_LINE_NUMBER,
+}
 
 
-@dataclass
+@dataclass(slots=True)
 class LogRecord:
     level: LogLevel
     app_name: str
     message: str
-    timestamp: datetime
-    thread_name: str | None
-    process_name: str | None
-    line_number: int | None
-    func_name: str | None
-    module_name: str | None
+    timestamp: float  # POSIX timestamp, as returned by time.time()
+    thread_name: str | None = None
+    process_name: str | None = None
+    line_number: int | None = None
+    func_name: str | None = None
+    module_name: str | None = None
 
     def get_optional_fields(self) -> dict[str, str | int]:
-        return {k: v for k, v in dataclasses.asdict(self).items() if k in _optional_keys and v is not None}
+        return {k: v for k in _optional_keys if (v := getattr(self, k)) is not None}
 
     def get_fields(self) -> dict[str, str | int]:
-        return {k: v for k, v in dataclasses.asdict(self).items() if v is not None}
+        return {k: v for k in _record_keys if (v := getattr(self, k)) is not None}
+
+
+@dataclass(slots=True)
+class LogPayload:
+    payload: LogRecord
+    logger: "DiscordLogger"
 
 
 _embedded_key_to_name = {
@@ -91,21 +141,54 @@ _embedded_key_to_name = {
 }
 
 
-def format_payload_embedded(log_record: LogRecord) -> DiscordEmbed:
+# Per level name, embed title and color, and footer shared by all the embeds
+_level_to_name = {level.value: level.name for level in LogLevel}
+_level_to_title = {level.value: f"`{level.name}`" for level in LogLevel}
+_level_to_color = {level.value: int(LevelColor[level.name], 16) for level in LogLevel}
+_embed_footer = {'text': f"{_package_name} {__version__}"}
+
+
+def _truncate(text: str, max_length: int) -> str:
+    return text if len(text) <= max_length else f"{text[:max_length - 1]}…"
+
+
+def format_payload_embedded(log_record: LogRecord) -> dict[str, Any]:
     """Generate a Discord embed that acts as payload for the webhook.
 
     :param log_record:
-    :return:
+    :return: Embed object, as sent to the Discord API
+    """
+    level = log_record.level
+    return {
+        'title': _level_to_title[level],
+        # Truncated to Discord limits, an embed over them would fail the whole batch it is sent with
+        'description': _truncate(log_record.message, _MAX_DESCRIPTION_LENGTH),
+        'author': {'name': _truncate(log_record.app_name, _MAX_AUTHOR_LENGTH)},
+        'footer': _embed_footer,
+        'color': _level_to_color[level],
+        'timestamp': datetime.fromtimestamp(log_record.timestamp, timezone.utc).isoformat(),
+        'fields': [{'name': _embedded_key_to_name[k], 'value': str(v), 'inline': True}
+                   for k in _optional_keys if (v := getattr(log_record, k)) is not None],
+    }
+
+
+def _get_embed_length(embed: dict[str, Any]) -> int:
+    """Return the number of characters of the embed counted by Discord against the limit of a message.
+
+    :param embed: Embed object, as sent to the Discord API
+    :return: Number of characters
     """
-    level_color = LevelColor[log_record.level.name]
-    e = DiscordEmbed(title=f"`{log_record.level.name}`", description=log_record.message)
-    e.set_author(name=log_record.app_name)
-    e.set_footer(text=f"{_package_name} {__version__}")
-    e.set_color(level_color)
-    e.set_timestamp(timestamp=log_record.timestamp.astimezone(tz=timezone.utc))
-    for field_name, field_value in log_record.get_optional_fields().items():
-        e.add_embed_field(name=_embedded_key_to_name[field_name], value=field_value)
-    return e
+    return (len(embed['title']) + len(embed['description']) + len(embed['author']['name'])
+            + len(embed['footer']['text']) + sum(len(f['name']) + len(f['value']) for f in embed['fields']))
+
+
+def format_timestamp(timestamp: float) -> str:
+    """Format a POSIX timestamp as displayed in the plain messages, in UTC.
+
+    :param timestamp: POSIX timestamp
+    :return: Formatted timestamp, e.g. `2024-01-01 12:00:00+00:00`
+    """
+    return time.strftime('%Y-%m-%d %H:%M:%S+00:00', time.gmtime(timestamp))
 
 
 def format_payload_message(log_record: LogRecord, message_fmt: str) -> str:
@@ -116,35 +199,133 @@ def format_payload_message(log_record: LogRecord, message_fmt: str) -> str:
     :return: Formatted message
     """
     fields = log_record.get_fields()
-    ts = datetime.strftime(log_record.timestamp, '%Y-%m-%d %H:%M:%S')
-    fields['timestamp'] = ts
-    fields['level'] = log_record.level.name
+    fields['timestamp'] = format_timestamp(log_record.timestamp)
+    fields['level'] = _level_to_name[log_record.level]
     message = message_fmt.format(**fields)
     return message
 
 
+_thread_local = threading.local()
+_process_name: str | None = None
+
+
+def _get_thread_name() -> str:
+    """Return the name of the current thread, cached for the thread lifetime.
+
+    :return: Thread name
+    """
+    try:
+        return _thread_local.name
+    except AttributeError:
+        name = _thread_local.name = threading.current_thread().name
+        return name
+
+
+def _get_process_name() -> str:
+    """Return the name of the current process, cached until the process forks.
+
+    :return: Process name
+    """
+    global _process_name
+    if _process_name is None:
+        # Only imported when a logger embeds the process name, it is not needed otherwise
+        import multiprocessing
+        _process_name = multiprocessing.current_process().name
+    return _process_name
+
+
+def _reset_process_name():
+    # multiprocessing names the child process after the fork, so resolve the name again on first use
+    global _process_name
+    _process_name = None
+
+
+_fmt_field_to_expr = {
+    'timestamp': "format_timestamp(r.timestamp)",
+    'level': "_level_to_name[r.level]",
+}
+
+
+def _compile_message_fmt(message_fmt: str) -> Callable[[LogRecord], str]:
+    """Compile the message formatted string into a function formatting a log record, equivalent to
+    `format_payload_message(log_record, message_fmt)` but reading the record attributes directly.
+
+    :param message_fmt: Message formatted string, with log record field names as replacement fields
+    :return: Function formatting a log record
+    """
+    fstring = re.sub(r"\{(\w+)\}", lambda m: "{" + _fmt_field_to_expr.get(m[1], f"r.{m[1]}") + "}", message_fmt)
+    namespace = {'format_timestamp': format_timestamp, '_level_to_name': _level_to_name}
+    exec(f"def _format_message(r):\n    return f{fstring!r}\n", namespace)
+    return namespace['_format_message']
+
+
+_module_names: dict[str, str] = {}
+
+
+def _get_module_name(file_name: str) -> str:
+    """Return the module name (source file base name) of a file, cached per file.
+
+    :param file_name: Path of the source file
+    :return: Module name
+    """
+    module_name = _module_names.get(file_name)
+    if module_name is None:
+        module_name = _module_names[file_name] = os.path.basename(file_name)
+    return module_name
+
+
 def _find_caller() -> tuple[str, int, str]:
     """Find the stack frame of the caller so that we can note the source file name, line number and function name.
 
     :return: caller file name, line number and function name
     """
-    cur_frame = inspect.currentframe()
-    caller_frame = inspect.getouterframes(cur_frame, 1)[-2]
-    return caller_frame.filename, caller_frame.lineno, caller_frame.function
+    # Skip _find_caller, the caller info collector and _log, then log or the level method the caller called
+    frame = sys._getframe(3)
+    while frame.f_code.co_filename == _srcfile:
+        frame = frame.f_back
+    code = frame.f_code
+    return code.co_filename, frame.f_lineno, code.co_name
 
 
-def _parse_level_to_int(level: int | str | LogLevel) -> int:
-    """Return the log level as int
+# File name of the code of this module, which is not `__file__` when the module is imported from a sourceless .pyc
+_srcfile = _find_caller.__code__.co_filename
 
-    :param level: Log level
-    :return: Int log level
+
+_key_to_expr = {
+    'thread_name': "_get_thread_name()",
+    'process_name': "_get_process_name()",
+    'func_name': "caller_func",
+    'module_name': "_get_module_name(caller_path)",
+    'line_number': "caller_lineno",
+}
+# Optional fields of LogRecord, in the order of its constructor
+_caller_info_keys = ('thread_name', 'process_name', 'line_number', 'func_name', 'module_name')
+_CallerInfo = tuple[str | None, str | None, int | None, str | None, str | None]
+_caller_info_collectors: dict[int, Callable[[], _CallerInfo]] = {}
+
+
+def _get_caller_info_collector(embed_mask: int) -> Callable[[], _CallerInfo]:
+    """Return a function collecting exactly the fields to embed for the embed flags, compiled once per combination of
+    flags: no flag is tested when collecting the fields, and the caller frame is only looked up if it is needed.
+
+    The fields are returned as a tuple in the order of the `LogRecord` constructor (see `_caller_info_keys`), with
+    None for the fields that are not embedded.
+
+    :param embed_mask: Embed flags
+    :return: Function returning the fields to embed
     """
-    if isinstance(level, LogLevel):
-        return level.value
-    elif isinstance(level, int):
-        return level
-    else:
-        return LogLevel[level].value
+    collector = _caller_info_collectors.get(embed_mask)
+    if collector is None:
+        lines = ["def _collect_caller_info():"]
+        if embed_mask & _FRAME_FLAGS:
+            lines.append("    caller_path, caller_lineno, caller_func = _find_caller()")
+        items = ", ".join(_key_to_expr[k] if embed_mask & _key_to_flag[k] else "None" for k in _caller_info_keys)
+        lines.append(f"    return ({items})")
+        namespace = {'_find_caller': _find_caller, '_get_module_name': _get_module_name,
+                     '_get_thread_name': _get_thread_name, '_get_process_name': _get_process_name}
+        exec("\n".join(lines), namespace)
+        collector = _caller_info_collectors[embed_mask] = namespace['_collect_caller_info']
+    return collector
 
 
 def _parse_level(level: int | str | LogLevel) -> LogLevel:
@@ -153,19 +334,325 @@ def _parse_level(level: int | str | LogLevel) -> LogLevel:
     :param level: Log level
     :return: Parsed log level
     """
-    if isinstance(level, LogLevel):
-        return level
-    elif isinstance(level, int):
-        return LogLevel(level)
-    else:
-        return LogLevel[level]
+    if isinstance(level, int):
+        # LogLevel members hash like their value, so they map to themselves
+        try:
+            return _level_by_value[level]
+        except KeyError:
+            raise ValueError(f"{level!r} is not a valid {LogLevel.__name__}") from None
+    return _level_by_name[level]
+
+
+class _PayloadBuilder:
+    def __init__(self):
+        """Pack the formatted log records of a batch into as few webhook execution payloads as Discord limits allow,
+        keeping their order.
+        """
+        self._webhook_kwargs: dict[str, Any] = {}
+        self._content: str | None = None
+        self._embeds: list[dict[str, Any]] = []
+        self._embeds_length = 0
+        self.payloads: list[dict[str, Any]] = []
+
+    def set_webhook_kwargs(self, webhook_kwargs: dict[str, Any]) -> None:
+        """Close the pending payload, the next ones get the webhook fields.
+
+        :param webhook_kwargs: Additional fields of the next payloads
+        """
+        self.close()
+        self._webhook_kwargs = webhook_kwargs
+
+    def add_message(self, message: str) -> None:
+        message = _truncate(message, _MAX_CONTENT_LENGTH)
+        content = self._content
+        if content and len(content) + len(message) + 1 > _MAX_CONTENT_LENGTH:
+            self.close()
+            content = None
+        self._content = f"{content}\n{message}" if content else message
+
+    def add_embed(self, embed: dict[str, Any]) -> None:
+        length = _get_embed_length(embed)
+        if self._embeds and self._embeds_length + length > _MAX_EMBEDS_LENGTH:
+            self.close()
+        self._embeds.append(embed)
+        self._embeds_length += length
+
+    def close(self) -> None:
+        """Close the pending payload, the next records go in a new one."""
+        if not self._content and not self._embeds:
+            return
+        payload = dict(self._webhook_kwargs)
+        if self._content:
+            payload['content'] = self._content
+        if self._embeds:
+            payload['embeds'] = self._embeds
+        self._content = None
+        self._embeds = []
+        self._embeds_length = 0
+        self.payloads.append(payload)
+
+
+class _Dispatcher:
+    def __init__(self, webhook_url: str,
+                 loop: asyncio.AbstractEventLoop,
+                 queue_size: int = _DEFAULT_QUEUE_SIZE,
+                 batch_window_ms: float = _DEFAULT_BATCH_WINDOW_MS):
+        """Task running on the manager's event loop that sends the log records queued for one webhook url to Discord.
+
+        Records are pushed by `DiscordLogger.log` with `put`, which never blocks the caller: when the queue is
+        full, the record is dropped and counted. Once the queue is drained below half its size, a single record
+        reporting the number of messages dropped since the first drop is sent.
+
+        Records arriving within `batch_window_ms` of the first record are sent together, up to 10 (the maximum number
+        of embeds Discord accepts) per webhook execution.
+
+        The queue is a thread-safe `queue.Queue`, so that logging only costs a `put_nowait`: the event loop is only
+        woken up (with `call_soon_threadsafe`) when the dispatcher is idle, waiting for records.
+
+        This class should not be used directly, dispatchers are created and shared by the loggers through
+        `_LoggerManager.get_dispatcher(webhook_url)`.
+
+        :param webhook_url: Url of the webhook the records are sent to
+        :param loop: Running event loop the dispatcher runs on
+        :param queue_size: Maximum number of records waiting to be sent
+        :param batch_window_ms: Time to wait for more records before sending a batch, in milliseconds
+        """
+        self._webhook_url = webhook_url
+        self._queue_size = queue_size
+        self._batch_window = batch_window_ms / 1000
+        self._low_water = queue_size // 2
+        # Set in a forked child, the dispatcher is restarted on its first use there
+        self._stale = False
+        self._start(loop)
+
+    def _start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Start the dispatcher on the event loop, with an empty queue.
+
+        :param loop: Running event loop the dispatcher runs on
+        """
+        self._loop = loop
+        # A None payload is the sentinel stopping the dispatcher
+        self._queue: queue.Queue[LogPayload | None] = queue.Queue(maxsize=self._queue_size)
+        self._stopping = False
+        # Set by `stop`, no payload is sent anymore
+        self._stopped = False
+        # Set when the dispatcher waits for records, only then `put` wakes it up
+        self._idle = False
+        self._wakeup = asyncio.Event()
+        self._dropped = 0
+        self._dropped_since: float | None = None
+        self._dropped_lock = threading.Lock()
+        self._run_task: asyncio.Task | None = None
+        self._task = asyncio.run_coroutine_threadsafe(self._run(), loop)
+
+    def _restart(self) -> None:
+        """Restart the stale dispatcher in a forked child, on the child's event loop. The records queued before the
+        fork are sent by the parent.
+        """
+        with _manager._lock:
+            if self._stale:
+                if self._run_task is not None:
+                    # Copied from the parent, the task never runs again: kept referenced, so that it isn't reported as
+                    # destroyed while pending
+                    _manager._forked_tasks.append(self._run_task)
+                self._start(_manager._get_loop())
+                self._stale = False
+                _manager._register_child_stop()
+
+    def put(self, payload: LogPayload | None) -> None:
+        """Queue a payload to be sent, drop it if the queue is full.
+
+        :param payload: Payload to send
+        """
+        if self._stopped:
+            warnings.warn("Log dropped, the dispatcher is stopped (the interpreter is exiting)")
+            return
+        if self._stale:
+            self._restart()
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            # Only taken on overflow, the lock keeps the counter exact when several threads drop at once
+            with self._dropped_lock:
+                if not self._dropped:
+                    self._dropped_since = payload.payload.timestamp
+                self._dropped += 1
+            return
+        if self._idle:
+            self._idle = False
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def flush(self) -> None:
+        """Block until all the queued payloads are sent."""
+        if self._stale:
+            self._restart()
+        if not self._task.done():
+            self._queue.join()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Send the queued payloads and stop the dispatcher. The payloads still queued after `timeout` are abandoned.
+
+        :param timeout: Maximum time to wait for the queued payloads to be sent, in seconds. Wait forever if None
+        """
+        self._stopped = True
+        # Nothing was logged in the forked child
+        if self._stale or self._task.done():
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            # The sentinel is queued last, the dispatcher stops once all the payloads are sent
+            self._queue.put(None, timeout=timeout)
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+            self._task.result(None if deadline is None else max(deadline - time.monotonic(), 0))
+        except (queue.Full, TimeoutError):
+            self._task.cancel()
+            warnings.warn(f"Stopped before sending {self._queue.qsize()} queued log messages (timed out)")
+
+    async def _run(self) -> None:
+        self._run_task = asyncio.current_task()
+        while not self._stopping:
+            try:
+                payload = self._queue.get_nowait()
+            except queue.Empty:
+                await self._wait_put()
+                continue
+            if payload is None:
+                self._queue.task_done()
+                break
+            batch = await self._get_batch(payload)
+            try:
+                await self._dispatch(batch)
+                if self._dropped and self._queue.qsize() <= self._low_water:
+                    await self._dispatch_dropped(batch[-1].logger)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _wait_put(self, timeout: float | None = None) -> bool:
+        """Wait until a payload may have been queued. Wake-ups can be spurious, the queue must be checked again.
+
+        :param timeout: Maximum time to wait, in seconds. Wait forever if None
+        :return: False if the wait timed out
+        """
+        self._wakeup.clear()
+        self._idle = True
+        if not self._queue.empty():
+            self._idle = False
+            return True
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    async def _get_batch(self, payload: LogPayload) -> list[LogPayload]:
+        """Collect the payloads queued within the batch window following `payload`.
+
+        :param payload: First payload of the batch
+        :return: Batch of payloads, in queue order
+        """
+        batch = [payload]
+        deadline = self._loop.time() + self._batch_window
+        while len(batch) < _MAX_BATCH_SIZE:
+            try:
+                payload = self._queue.get_nowait()
+            except queue.Empty:
+                timeout = deadline - self._loop.time()
+                if timeout > 0 and await self._wait_put(timeout):
+                    continue
+                break
+            if payload is None:
+                # Send the batch, then stop
+                self._queue.task_done()
+                self._stopping = True
+                break
+            batch.append(payload)
+        return batch
+
+    async def _dispatch(self, batch: list[LogPayload]) -> None:
+        for webhook_payload in self._build_payloads(batch):
+            try:
+                response = await _manager.post(self._webhook_url, webhook_payload)
+            except Exception as e:
+                warnings.warn(f"Failed to send log: {e!r}")
+                continue
+            if not response.is_success:
+                warnings.warn(f"Failed to send log. Status code: {response.status_code}")
+
+    @staticmethod
+    def _build_payloads(batch: list[LogPayload]) -> list[dict[str, Any]]:
+        """Format the batch into webhook execution payloads, as few as possible, keeping the records order.
+
+        Loggers sharing the webhook url may have different webhook settings (payload type and webhook fields): the
+        records of consecutive loggers with the same settings share executions, the others start a new one.
+
+        :param batch: Batch of payloads
+        :return: Webhook execution payloads
+        """
+        builder = _PayloadBuilder()
+        settings = None
+        for payload in batch:
+            logger = payload.logger
+            # Tuples compare their items by identity first, this is cheap for records of the same logger
+            if (logger_settings := (logger._payload_type, logger._webhook_kwargs)) != settings:
+                settings = logger_settings
+                builder.set_webhook_kwargs(logger._webhook_kwargs)
+            try:
+                logger._dispatcher(builder, payload.payload)
+            except Exception as e:
+                # Only this record is lost, not the whole batch
+                warnings.warn(f"Failed to format log: {e!r}")
+        builder.close()
+        return builder.payloads
+
+    async def _dispatch_dropped(self, logger: "DiscordLogger") -> None:
+        with self._dropped_lock:
+            dropped, self._dropped = self._dropped, 0
+            since = self._dropped_since
+        message = f"Dropped {dropped} log messages since {format_timestamp(since)} (queue full)"
+        log_record = LogRecord(level=LogLevel.WARNING, app_name=logger._app_name, message=message,
+                               timestamp=time.time())
+        await self._dispatch([LogPayload(payload=log_record, logger=logger)])
+
+
+def _make_level_method(level: LogLevel) -> Callable[["DiscordLogger", str | Callable[[], str]], None]:
+    """Generate the `DiscordLogger` method logging a message with the given level (`info`, `warning`, ...).
+
+    The level filter is inlined so that filtered out messages cost a single int comparison.
+
+    :param level: Log level of the method
+    :return: Logger method
+    """
+    level_value = level.value
+
+    def log_level(self: "DiscordLogger", message: str | Callable[[], str]) -> None:
+        if level_value < self._level_value:
+            return
+        self._log(level, message)
+
+    log_level.__name__ = level.name.lower()
+    log_level.__qualname__ = f"DiscordLogger.{log_level.__name__}"
+    log_level.__doc__ = f"""Send a message with level {level.name} to the Discord channel, see `DiscordLogger.log`.
+
+        :param message: The message to send, or a function returning it
+        """
+    return log_level
 
 
 class DiscordLogger:
+    __slots__ = ('_app_name', '_webhook_url', '_webhook_kwargs', '_worker', '_payload_type', '_embed_mask', '_level',
+                 '_level_value', '_message_fmt', '_format_message', '_collect_caller_info', '_dispatcher')
+
     _level: LogLevel
-    _webhook: DiscordWebhook
+    _level_value: int
+    _embed_mask: int
+    _webhook_url: str
+    _webhook_kwargs: dict[str, Any]
+    _worker: _Dispatcher
     _message_fmt: str
-    _dispatcher: Callable[[LogRecord], None]
+    _format_message: Callable[[LogRecord], str]
+    _collect_caller_info: Callable[[], _CallerInfo]
+    _dispatcher: Callable[[_PayloadBuilder, LogRecord], None]
 
     def __init__(self, name: str,
                  *,
@@ -178,7 +665,9 @@ class DiscordLogger:
                  embed_module_name: bool = False,
                  embed_all: bool = False,
                  payload_type: PayloadType = PayloadType.EMBEDDED,
-                 **discord_webhook_kwargs
+                 batch_window_ms: float = _DEFAULT_BATCH_WINDOW_MS,
+                 queue_size: int = _DEFAULT_QUEUE_SIZE,
+                 **webhook_kwargs
                  ):
         """Logger class that send logged messages to Discord through webhook.
         The logged messages are dispatched either as a Discord Embedded (default) or plain message.
@@ -190,13 +679,18 @@ class DiscordLogger:
         with the passed name (usually the application name or just `__name__`). If a logger is registered with that
         name, it will be returned.
 
+        Logging never blocks on the network: the messages are queued and sent to Discord by a background task
+        shared by all the loggers using the same webhook url. Use `flush()` to wait for the queued messages to be sent.
+        Messages logged in a burst are batched, up to 10 per webhook execution.
+
         The logs can embed optional fields (all deactivate by default):
-            - `embed_process_name`: name of the thread
-            - `embed_thread_name`: name of the process
+            - `embed_process_name`: name of the process
+            - `embed_thread_name`: name of the thread
             - `embed_func_name`: name of the function
             - `embed_module_name`: name of the module
             - `embed_line_number`: line number
-        Use `embed_all` to embed everything.
+        Use `embed_all` to embed everything. The thread and process names are read on their first log, renaming a
+        thread afterward is not reflected in its logs.
 
         Example:
 
@@ -217,36 +711,48 @@ class DiscordLogger:
         :param embed_func_name: Should log messages embed the function name. Default is False
         :param embed_module_name: Should log messages embed the module name. Default is False
         :param embed_all: Should log messages embed everything. Default is False
+        :param batch_window_ms: Time the dispatcher waits for more messages to batch before sending, in milliseconds.
+            Set by the first logger created for a webhook url. Default is 50
+        :param queue_size: Maximum number of messages waiting to be sent, further messages are dropped until the queue
+            drains. Set by the first logger created for a webhook url. Default is 1024
+        :param webhook_kwargs: Additional fields of the webhook execution payload, among `username`, `avatar_url`,
+            `tts`, `allowed_mentions`, `thread_name` and `flags`
         """
+        # `queue.Queue` is unbounded for a size below 1
+        if queue_size < 1:
+            raise ValueError(f"queue_size must be at least 1, got {queue_size!r}")
+        for key in webhook_kwargs:
+            if key not in _WEBHOOK_KWARGS:
+                raise TypeError(f"{type(self).__name__}() got an unexpected keyword argument {key!r}")
         if not webhook_url:
             webhook_url = _get_webhook_url()
         self._app_name = name
-        self._webhook = DiscordWebhook(url=webhook_url, **discord_webhook_kwargs)
+        self._webhook_url = webhook_url
+        self._webhook_kwargs = webhook_kwargs
 
         self._payload_type = payload_type
 
         if embed_all:
-            self._optional_fields = {k: True for k in _optional_keys}
+            self._embed_mask = _ALL_FLAGS
         else:
-            self._optional_fields = {
-                'thread_name': embed_thread_name,
-                'process_name': embed_process_name,
-                'module_name': embed_module_name,
-                'func_name': embed_func_name,
-                'line_number': embed_line_number
-            }
+            self._embed_mask = ((_FLAG_THREAD_NAME if embed_thread_name else 0)
+                                | (_FLAG_PROCESS_NAME if embed_process_name else 0)
+                                | (_FLAG_MODULE_NAME if embed_module_name else 0)
+                                | (_FLAG_FUNC_NAME if embed_func_name else 0)
+                                | (_FLAG_LINE_NUMBER if embed_line_number else 0))
 
         self._set_log_level(level)
         self._set_message_fmt()
+        self._collect_caller_info = _get_caller_info_collector(self._embed_mask)
         self._set_dispatcher()
+        # Last, once the arguments are validated: this may start the event loop thread and register a dispatcher
+        self._worker = _manager.get_dispatcher(webhook_url, batch_window_ms, queue_size)
 
-    def _dispatch_message(self, log_record: LogRecord):
-        message = format_payload_message(log_record, self._message_fmt)
-        self._webhook.content = message
+    def _dispatch_message(self, builder: _PayloadBuilder, log_record: LogRecord):
+        builder.add_message(self._format_message(log_record))
 
-    def _dispatch_embed(self, log_record: LogRecord):
-        embed = format_payload_embedded(log_record)
-        self._webhook.add_embed(embed)
+    def _dispatch_embed(self, builder: _PayloadBuilder, log_record: LogRecord):
+        builder.add_embed(format_payload_embedded(log_record))
 
     def _set_message_fmt(self):
         # Format: timestamp | level | app_name
@@ -256,13 +762,14 @@ class DiscordLogger:
         for k in _optional_keys:
             if k == "line_number":
                 continue
-            if self._optional_fields[k]:
+            if self._embed_mask & _key_to_flag[k]:
                 self._message_fmt += "::{" + k + "}"
-        if self._optional_fields['line_number']:
+        if self._embed_mask & _FLAG_LINE_NUMBER:
             # self._message_fmt = self._message_fmt[:-1]
             self._message_fmt += ":{line_number}"
 
         self._message_fmt += ":: {message}"
+        self._format_message = _compile_message_fmt(self._message_fmt)
 
     def _set_dispatcher(self):
         match self._payload_type:
@@ -274,12 +781,13 @@ class DiscordLogger:
                 raise ValueError(f"Unknown payload type: {self._payload_type}")
 
     def _set_log_level(self, level: LogLevel | int | str):
-        if isinstance(level, LogLevel):
-            self._level = level
-        elif isinstance(level, int):
-            self._level = LogLevel(level)
-        else:
-            self._level = LogLevel[level]
+        self._level = _parse_level(level)
+        self._level_value = self._level.value
+
+    def _set_embed_flag(self, flag: int, value: bool):
+        self._embed_mask = (self._embed_mask & ~flag) | (flag if value else 0)
+        self._set_message_fmt()
+        self._collect_caller_info = _get_caller_info_collector(self._embed_mask)
 
     @property
     def payload_type(self) -> PayloadType:
@@ -300,116 +808,133 @@ class DiscordLogger:
 
     @property
     def embed_module_name(self) -> bool:
-        return self._optional_fields['module_name']
+        return bool(self._embed_mask & _FLAG_MODULE_NAME)
 
     @embed_module_name.setter
     def embed_module_name(self, value: bool):
-        self._optional_fields['module_name'] = value
+        self._set_embed_flag(_FLAG_MODULE_NAME, value)
 
     @property
     def embed_func_name(self) -> bool:
-        return self._optional_fields['func_name']
+        return bool(self._embed_mask & _FLAG_FUNC_NAME)
 
     @embed_func_name.setter
     def embed_func_name(self, value: bool):
-        self._optional_fields['func_name'] = value
+        self._set_embed_flag(_FLAG_FUNC_NAME, value)
 
     @property
     def embed_line_number(self) -> bool:
-        return self._optional_fields['line_number']
+        return bool(self._embed_mask & _FLAG_LINE_NUMBER)
 
     @embed_line_number.setter
     def embed_line_number(self, value: bool):
-        self._optional_fields['line_number'] = value
+        self._set_embed_flag(_FLAG_LINE_NUMBER, value)
 
     @property
     def embed_thread_name(self) -> bool:
-        return self._optional_fields['thread_name']
+        return bool(self._embed_mask & _FLAG_THREAD_NAME)
 
     @embed_thread_name.setter
     def embed_thread_name(self, value: bool):
-        self._optional_fields['thread_name'] = value
+        self._set_embed_flag(_FLAG_THREAD_NAME, value)
 
     @property
     def embed_process_name(self) -> bool:
-        return self._optional_fields['process_name']
+        return bool(self._embed_mask & _FLAG_PROCESS_NAME)
 
     @embed_process_name.setter
     def embed_process_name(self, value: bool):
-        self._optional_fields['process_name'] = value
+        self._set_embed_flag(_FLAG_PROCESS_NAME, value)
 
     def dispatch_message(self, log_record: LogRecord):
         pass
 
-    def log(self, level: int | str | LogLevel, message: str) -> None:
+    def log(self, level: int | str | LogLevel, message: str | Callable[[], str]) -> None:
         """Send a message to the Discord channel. The level acts as a filter by comparing it to the object log level.
 
+        The message can be passed as a function taking no argument and returning it, which is only called if the
+        message passes the level filter. Use it to skip building expensive messages that would be filtered out:
+
+        .. code-block:: python
+            _logger.debug(lambda: f"State: {expensive_dump()}")
+
+        Any callable message is called, including classes and callable objects: log `str(obj)` to send such an object
+        as is. Other messages that are not strings are sent as their `str()`.
+
         :param level: Log level
-        :param message: The message to send
+        :param message: The message to send, or a function returning it
         """
-        log_timestamp = datetime.now()
-        level_int = _parse_level_to_int(level)
-        if level_int < self._level.value:
+        # Parse once, `LogLevel` members compare as their int value
+        log_level = level if type(level) is LogLevel else _parse_level(level)
+        if log_level < self._level_value:
             return
-        log_level = _parse_level(level)
-        fields = self.get_fields()
-        log_record = LogRecord(
-            level=log_level,
-            app_name=self._app_name,
-            timestamp=log_timestamp,
-            message=message,
-            thread_name=fields.get("thread_name", None),
-            process_name=fields.get("process_name", None),
-            line_number=fields.get("line_number", None),
-            func_name=fields.get("func_name", None),
-            module_name=fields.get("module_name", None),
-        )
-        self._dispatcher(log_record)
-        response = self._webhook.execute(remove_embeds=True)
-        if response.status_code != 200:
-            warnings.warn(f"Failed to send log. Status code: {response.status_code}")
+        self._log(log_level, message)
+
+    def _log(self, log_level: LogLevel, message: str | Callable[[], str]) -> None:
+        """Queue the message to be sent, once it passed the level filter.
+
+        :param log_level: Parsed log level
+        :param message: The message to send, or a function returning it
+        """
+        # Anything else than a string, e.g. an exception, is sent as its `str()`
+        message = str(message()) if callable(message) else str(message)
+        log_record = LogRecord(log_level, self._app_name, message, time.time(), *self._collect_caller_info())
+        self._worker.put(LogPayload(payload=log_record, logger=self))
+
+    def flush(self) -> None:
+        """Block until all the messages logged through this logger's webhook are sent to Discord."""
+        self._worker.flush()
 
     def get_fields(self) -> dict[str, str | int]:
         """Returns the fields to be embedded into the message.
 
         :return: Embedded fields
         """
-        fields = {}
-        if any([self._optional_fields[k] for k in _optional_keys]):
-            caller_path, caller_lineno, caller_func = _find_caller()
-            caller_module_name = caller_path.split("/")[-1]
-            # caller_package_name = caller_path.split("/")[-2]
-            if self._optional_fields["func_name"]:
-                fields["func_name"] = caller_func
-            if self._optional_fields["module_name"]:
-                fields["module_name"] = caller_module_name
-            if self._optional_fields["line_number"]:
-                fields["line_number"] = caller_lineno
-        if self._optional_fields["thread_name"]:
-            fields["thread_name"] = threading.current_thread().name
-        if self._optional_fields["process_name"]:
-            process_name = multiprocessing.current_process().name
-            fields["process_name"] = process_name
-        return fields
-
-    info = functools.partialmethod(log, LogLevel.INFO.value)
-    warning = functools.partialmethod(log, LogLevel.WARNING.value)
-    error = functools.partialmethod(log, LogLevel.ERROR.value)
-    critical = functools.partialmethod(log, LogLevel.CRITICAL.value)
-    debug = functools.partialmethod(log, LogLevel.DEBUG.value)
+        return {k: v for k, v in zip(_caller_info_keys, self._collect_caller_info()) if v is not None}
+
+    info = _make_level_method(LogLevel.INFO)
+    warning = _make_level_method(LogLevel.WARNING)
+    error = _make_level_method(LogLevel.ERROR)
+    critical = _make_level_method(LogLevel.CRITICAL)
+    debug = _make_level_method(LogLevel.DEBUG)
 
     def get_log_record(self, log_level: LogLevel, message: str, timestamp: datetime) -> LogRecord:
         """Returns a LogRecord object with the passed level, message and timestamp.
 
         :param log_level: The to be logged level
         :param message: The message to be logged message
-        :param timestamp: The to be logged timestamp
+        :param timestamp: The to be logged timestamp, naive datetimes are in local time
         :return: LogRecord object
         """
-        optional_fields = self.get_fields()
-        log_record = LogRecord(level=log_level, message=message, timestamp=timestamp, app_name=self._app_name,
-                               **optional_fields)
-        return log_record
+        return LogRecord(log_level, self._app_name, message, timestamp.timestamp(), *self._collect_caller_info())
+
+
+class _ResolverExecutor(concurrent.futures.ThreadPoolExecutor):
+    """Default executor of the event loop, used to resolve the webhook host when opening a connection.
+
+    The `concurrent.futures` executors refuse new work once the interpreter starts shutting down, before the `atexit`
+    hooks sending the last messages run: this one runs each call in a new daemon thread instead. Host resolution only
+    happens on new connections, which are kept alive and reused. Since Python 3.12 no thread can be started either at
+    that point: the call then runs inline, blocking the event loop thread while it resolves.
+    """
+
+    def submit(self, fn, /, *args, **kwargs) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+        try:
+            threading.Thread(target=run, name=f"{_package_name}-Resolver", daemon=True).start()
+        except RuntimeError:
+            # "can't create new thread at interpreter shutdown"
+            run()
+        return future
 
 
 class _LoggerManager:
@@ -417,12 +942,95 @@ class _LoggerManager:
         """Very basic class that acts as a registry and manager for logger objects. Very roughly based on the
         Python logging module.
 
+        The manager also owns what the loggers share: the dispatcher of each webhook url, and the HTTP client
+        sending the webhooks, whose connection pool is reused by all the loggers. The dispatchers and the HTTP client
+        run on a single event loop, started in a dedicated thread with the first dispatcher.
+
         This class should not be used directly and, in normal circumstances, there should be only one
         manager instanced in this module.
         """
 
         self._registry = {}
+        self._registry_lock = threading.Lock()
         self._factory = DiscordLogger
+        self._dispatchers: dict[str, _Dispatcher] = {}
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._http: httpx.AsyncClient | None = None
+        self._forked_tasks: list[asyncio.Task] = []
+        self._child_stop_registered = False
+
+    def get_dispatcher(self, webhook_url: str,
+                       batch_window_ms: float = _DEFAULT_BATCH_WINDOW_MS,
+                       queue_size: int = _DEFAULT_QUEUE_SIZE) -> _Dispatcher:
+        """Return the dispatcher of the webhook url, start a new one if there is none.
+
+        :param webhook_url: Url of the webhook
+        :param batch_window_ms: Batch window of the dispatcher, only used when a new one is started
+        :param queue_size: Queue size of the dispatcher, only used when a new one is started
+        :return: Running dispatcher
+        """
+        with self._lock:
+            dispatcher = self._dispatchers.get(webhook_url)
+            if dispatcher is None:
+                dispatcher = self._dispatchers[webhook_url] = _Dispatcher(webhook_url, self._get_loop(),
+                                                                          queue_size=queue_size,
+                                                                          batch_window_ms=batch_window_ms)
+        return dispatcher
+
+    async def post(self, webhook_url: str, payload: dict[str, Any]) -> httpx.Response:
+        """Execute the webhook with the payload. Must be awaited on the manager's event loop.
+
+        :param webhook_url: Url of the webhook
+        :param payload: Webhook execution payload
+        :return: Discord's response
+        """
+        return await self._http.post(webhook_url, json=payload)
+
+    def flush(self):
+        """Block until all the logged messages are sent to Discord."""
+        for dispatcher in list(self._dispatchers.values()):
+            dispatcher.flush()
+
+    def stop(self, timeout: float | None = None):
+        """Send the queued messages and stop all the dispatchers. Called once when the interpreter exits.
+
+        :param timeout: Maximum time to wait for all the queued messages to be sent, in seconds. Wait forever if None
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for dispatcher in list(self._dispatchers.values()):
+            dispatcher.stop(None if deadline is None else max(deadline - time.monotonic(), 0))
+
+    def _after_fork_in_child(self):
+        # The event loop thread does not survive the fork and the HTTP connections are shared with the parent: a new
+        # event loop and HTTP client are started in the child when a dispatcher is first used there, so that children
+        # which never log don't pay for them
+        self._registry_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._http = None
+        self._child_stop_registered = False
+        for dispatcher in self._dispatchers.values():
+            dispatcher._stale = True
+
+    def _register_child_stop(self):
+        # Called with `_lock` held. The `multiprocessing` children exit through `os._exit`, skipping the `atexit` hook:
+        # the dispatchers restarted in a child are also stopped on the `multiprocessing` exit path
+        if not self._child_stop_registered:
+            import multiprocessing.util
+            multiprocessing.util.Finalize(None, self.stop, args=(_EXIT_TIMEOUT_S,), exitpriority=10)
+            self._child_stop_registered = True
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        # Called with `_lock` held
+        if self._loop is None:
+            self._http = httpx.AsyncClient(http2=True, timeout=httpx.Timeout(_HTTP_TIMEOUT_S),
+                                           limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=60))
+            loop = asyncio.new_event_loop()
+            loop.set_default_executor(_ResolverExecutor())
+            threading.Thread(target=loop.run_forever, name=f"{_package_name}-EventLoop", daemon=True).start()
+            self._loop = loop
+        return self._loop
 
     def get_logger(self, name: str,
                    *,
@@ -432,7 +1040,9 @@ class _LoggerManager:
                    embed_func_name: bool = False,
                    embed_module_name: bool = False,
                    embed_all: bool = False,
-                   payload_type: PayloadType = PayloadType.EMBEDDED) -> DiscordLogger:
+                   payload_type: PayloadType = PayloadType.EMBEDDED,
+                   batch_window_ms: float = _DEFAULT_BATCH_WINDOW_MS,
+                   queue_size: int = _DEFAULT_QUEUE_SIZE) -> DiscordLogger:
         """ Returns a logger with the given name. If there is none registered, a new one is created with the passed
         keyword arguments.
 
@@ -444,23 +1054,57 @@ class _LoggerManager:
         :param embed_module_name:
         :param embed_all:
         :param payload_type:
+        :param batch_window_ms:
+        :param queue_size:
         :return:
         """
-        if name not in self._registry:
-            self._registry[name] = self._factory(name,
-                                                 embed_process_name=embed_process_name,
-                                                 embed_thread_name=embed_thread_name,
-                                                 embed_line_number=embed_line_number,
-                                                 embed_func_name=embed_func_name,
-                                                 embed_module_name=embed_module_name,
-                                                 embed_all=embed_all,
-                                                 payload_type=payload_type
-                                                 )
-        return self._registry[name]
+        logger = self._registry.get(name)
+        if logger is not None:
+            return logger
+        if not isinstance(name, str):
+            raise TypeError(f"Logger name must be a string, got {type(name).__name__}")
+        # Only logger creation is locked, so that two threads asking for a new name get the same logger
+        with self._registry_lock:
+            logger = self._registry.get(name)
+            if logger is None:
+                logger = self._registry[name] = self._factory(name,
+                                                              embed_process_name=embed_process_name,
+                                                              embed_thread_name=embed_thread_name,
+                                                              embed_line_number=embed_line_number,
+                                                              embed_func_name=embed_func_name,
+                                                              embed_module_name=embed_module_name,
+                                                              embed_all=embed_all,
+                                                              payload_type=payload_type,
+                                                              batch_window_ms=batch_window_ms,
+                                                              queue_size=queue_size
+                                                              )
+        return logger
+
+
+_manager = _LoggerManager()
+
+
+def _stop_at_exit():
+    _manager.stop(_EXIT_TIMEOUT_S)
+
+
+# Registered once for all the dispatchers, the queued messages are sent before the interpreter exits. As an `atexit`
+# hook, it runs once the non-daemon threads are joined, so their last messages are sent too.
+atexit.register(_stop_at_exit)
+
+
+def _after_fork_in_child():
+    _reset_process_name()
+    _manager._after_fork_in_child()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
 
 
-if _manager is _sentinel:
-    _manager = _LoggerManager()
+def flush() -> None:
+    """Block until all the logged messages are sent to Discord."""
+    _manager.flush()
 
 
 def get_logger(name: str,
@@ -470,7 +1114,9 @@ def get_logger(name: str,
                embed_func_name: bool = False,
                embed_module_name: bool = False,
                embed_all: bool = False,
-               payload_type: PayloadType | Literal["EMBEDDED", "MESSAGE"] = PayloadType.EMBEDDED) -> DiscordLogger:
+               payload_type: PayloadType | Literal["EMBEDDED", "MESSAGE"] = PayloadType.EMBEDDED,
+               batch_window_ms: float = _DEFAULT_BATCH_WINDOW_MS,
+               queue_size: int = _DEFAULT_QUEUE_SIZE) -> DiscordLogger:
     """Factory method for creating a DiscordLogger object. See the DiscordLogger class for more information.
 
     :param name: Logger name (usually the application name or just __name__)
@@ -481,6 +1127,10 @@ def get_logger(name: str,
     :param embed_module_name: Add caller module name to the logs (default: False)
     :param embed_all: Add all caller information
     :param payload_type: Payload message type, either EMBEDDED or MESSAGE (default: EMBEDDED)
+    :param batch_window_ms: Time the dispatcher waits for more messages to batch before sending, in milliseconds. Set by
+        the first logger created for a webhook url (default: 50)
+    :param queue_size: Maximum number of messages waiting to be sent, further messages are dropped until the queue
+        drains. Set by the first logger created for a webhook url (default: 1024)
     :return:The logged DiscordLogger object
     """
     if isinstance(payload_type, str):
@@ -492,4 +1142,6 @@ def get_logger(name: str,
                                embed_func_name=embed_func_name,
                                embed_module_name=embed_module_name,
                                embed_all=embed_all,
-                               payload_type=payload_type)
+                               payload_type=payload_type,
+                               batch_window_ms=batch_window_ms,
+                               queue_size=queue_size)
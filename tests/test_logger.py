@@ -0,0 +1,551 @@
+import compileall
+import http.server
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import httpx
+import pytest
+
+import discord_logger
+from discord_logger import logger as logger_module
+from discord_logger.logger import DiscordLogger, LogLevel, LogPayload, LogRecord, PayloadType
+
+
+class _Webhook:
+    """Mock webhook recording the executed payloads. Clear `release` to block the executions."""
+
+    def __init__(self):
+        self.payloads = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.started.set()
+        self.release.wait(5)
+        self.payloads.append(json.loads(request.content))
+        return httpx.Response(204)
+
+    def descriptions(self) -> list[list[str]]:
+        return [[embed['description'] for embed in payload['embeds']] for payload in self.payloads]
+
+
+@pytest.fixture
+def webhook(monkeypatch):
+    hook = _Webhook()
+    client = httpx.AsyncClient
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: client(transport=httpx.MockTransport(hook)))
+    # A manager per test, so that each test starts its own dispatchers
+    manager = logger_module._LoggerManager()
+    monkeypatch.setattr(logger_module, "_manager", manager)
+    yield hook
+    hook.release.set()
+    manager.stop()
+    if manager._loop is not None:
+        manager._loop.call_soon_threadsafe(manager._loop.stop)
+
+
+@pytest.fixture
+def server():
+    """Local HTTP server recording the executed payloads, for the tests running in another interpreter."""
+    payloads = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            payloads.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    # A host name, not an address, so that sending goes through the resolver
+    yield f"http://localhost:{httpd.server_address[1]}/webhook", payloads
+    httpd.shutdown()
+
+
+def _run_script(script: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(discord_logger.__file__)))
+    return subprocess.run([sys.executable, "-c", textwrap.dedent(script)], env=env, capture_output=True, text=True,
+                          timeout=30)
+
+
+def _build_payloads(logger: DiscordLogger, messages: list[str]) -> list[dict]:
+    return logger_module._Dispatcher._build_payloads(
+        [LogPayload(LogRecord(LogLevel.INFO, logger._app_name, message, 0.0), logger) for message in messages])
+
+
+def test_embed_payload(webhook):
+    logger = DiscordLogger("app", webhook_url="http://discord/webhook", embed_all=True, username="bot")
+    logger.error("Hello World!")
+    logger.flush()
+
+    assert len(webhook.payloads) == 1
+    payload = webhook.payloads[0]
+    assert payload['username'] == "bot"
+    assert 'content' not in payload
+    embed, = payload['embeds']
+    assert embed['title'] == "`ERROR`"
+    assert embed['description'] == "Hello World!"
+    assert embed['author'] == {'name': "app"}
+    assert embed['color'] == int(discord_logger.LevelColor.ERROR, 16)
+    assert [field['name'] for field in embed['fields']] == ["Thread", "Process", "Function", "Module", "Line"]
+
+
+def test_message_payload(webhook):
+    logger = DiscordLogger("app", webhook_url="http://discord/webhook", payload_type=PayloadType.MESSAGE)
+    logger.warning("Hello World!")
+    logger.flush()
+
+    payload, = webhook.payloads
+    assert 'embeds' not in payload
+    assert payload['content'].endswith("::**WARNING**::app:: Hello World!")
+
+
+def test_message_split(webhook):
+    logger = DiscordLogger("app", webhook_url="http://discord/webhook", payload_type=PayloadType.MESSAGE)
+    payloads = _build_payloads(logger, [f"{i}" * 900 for i in range(5)] + ["x" * 3000])
+
+    assert [len(payload['content'].split("\n")) for payload in payloads] == [2, 2, 1, 1]
+    assert all(len(payload['content']) <= 2000 for payload in payloads)
+    assert payloads[-1]['content'].endswith("x…")
+
+
+def test_embeds_split(webhook):
+    logger = DiscordLogger("app", webhook_url="http://discord/webhook")
+    payloads = _build_payloads(logger, ["x" * 1500] * 10)
+
+    assert [len(payload['embeds']) for payload in payloads] == [3, 3, 3, 1]
+    assert all(sum(map(logger_module._get_embed_length, payload['embeds'])) <= 6000 for payload in payloads)
+
+
+def test_message_str(webhook):
+    logger = DiscordLogger("app", webhook_url="http://discord/webhook", batch_window_ms=1000)
+    logger.info("a")
+    logger.info(None)
+    logger.info(ValueError("b"))
+    logger.flush()
+    logger.info("c")
+    logger.flush()
+
+    assert webhook.descriptions() == [["a", "None", "b"], ["c"]]
+
+
+def test_message_factory(webhook):
+    logger = DiscordLogger("app", webhook_url="http://discord/webhook", level="INFO", batch_window_ms=1000)
+    calls = []
+
+    def factory(message):
+        def build():
+            calls.append(message)
+            return message
+        return build
+
+    logger.debug(factory("debug"))
+    logger.log("DEBUG", factory("log debug"))
+    logger.info(factory("info"))
+    logger.log("ERROR", factory("log error"))
+    logger.flush()
+
+    assert calls == ["info", "log error"]
+    assert webhook.descriptions() == [["info", "log error"]]
+
+
+def test_format_error(webhook, monkeypatch):
+    format_payload_embedded = logger_module.format_payload_embedded
+
+    def format_or_raise(log_record):
+        if log_record.message == "boom":
+            raise RuntimeError("boom")
+        return format_payload_embedded(log_record)
+
+    monkeypatch.setattr(logger_module, "format_payload_embedded", format_or_raise)
+    logger = DiscordLogger("app", webhook_url="http://discord/webhook", batch_window_ms=1000)
+    with pytest.warns(UserWarning, match="Failed to format log"):
+        logger.info("a")
+        logger.info("boom")
+        logger.info("b")
+        logger.flush()
+    logger.info("c")
+    logger.flush()
+
+    assert webhook.descriptions() == [["a", "b"], ["c"]]
+
+
+def test_embed_truncate(webhook):
+    logger = DiscordLogger("a" * 300, webhook_url="http://discord/webhook")
+    embed, = _build_payloads(logger, ["x" * 5000])[0]['embeds']
+
+    assert len(embed['description']) == 4096
+    assert embed['description'].endswith("…")
+    assert len(embed['author']['name']) == 256
+
+
+def test_loggers_order(webhook):
+    a = DiscordLogger("a", webhook_url="http://discord/webhook", batch_window_ms=1000)
+    b = DiscordLogger("b", webhook_url="http://discord/webhook")
+    bot = DiscordLogger("bot", webhook_url="http://discord/webhook", username="bot")
+    a.info("a1")
+    b.info("b1")
+    a.info("a2")
+    bot.info("bot1")
+    a.info("a3")
+    a.flush()
+
+    # Loggers with the same webhook settings share executions
+    assert webhook.descriptions() == [["a1", "b1", "a2"], ["bot1"], ["a3"]]
+    assert [payload.get('username') for payload in webhook.payloads] == [None, "bot", None]
+
+
+def test_batching(webhook):
+    logger = DiscordLogger("app", webhook_url="http://discord/webhook", batch_window_ms=1000)
+    for i in range(25):
+        logger.info(f"{i}")
+    logger.flush()
+
+    assert webhook.descriptions() == [[f"{i}" for i in range(start, min(start + 10, 25))] for start in (0, 10, 20)]
+
+
+def test_overflow(webhook):
+    logger = DiscordLogger("app", webhook_url="http://discord/webhook", batch_window_ms=0, queue_size=4)
+    webhook.release.clear()
+    logger.info("0")
+    # The dispatcher is blocked sending the first record, the queue is empty
+    assert webhook.started.wait(5)
+    for i in range(1, 21):
+        logger.info(f"{i}")
+    webhook.release.set()
+    logger.flush()
+
+    descriptions = webhook.descriptions()
+    assert descriptions[:2] == [["0"], ["1", "2", "3", "4"]]
+    notice, = descriptions[2]
+    assert notice.startswith("Dropped 16 log messages since ")
+    assert len(descriptions) == 3
+
+
+@pytest.mark.parametrize("queue_size", [0, -1])
+def test_invalid_queue_size(webhook, queue_size):
+    with pytest.raises(ValueError):
+        DiscordLogger("app", webhook_url="http://discord/webhook", queue_size=queue_size)
+
+
+def test_invalid_webhook_kwargs(webhook):
+    with pytest.raises(TypeError, match="'content'"):
+        DiscordLogger("app", webhook_url="http://discord/webhook", content="text")
+    with pytest.raises(TypeError, match="'embed_level'"):
+        DiscordLogger("app", webhook_url="http://discord/webhook", embed_level=True)
+
+
+@pytest.mark.parametrize("kwargs", [{'level': "VERBOSE"}, {'payload_type': 2}])
+def test_invalid_arguments_start_nothing(webhook, kwargs):
+    with pytest.raises((KeyError, ValueError)):
+        DiscordLogger("app", webhook_url="http://discord/webhook", **kwargs)
+
+    assert not logger_module._manager._dispatchers
+    assert logger_module._manager._loop is None
+
+
+def test_flush(webhook):
+    logger = DiscordLogger("app", webhook_url="http://discord/webhook", batch_window_ms=0)
+    webhook.release.clear()
+    logger.info("0")
+    assert webhook.started.wait(5)
+    logger.info("1")
+    threading.Timer(0.1, webhook.release.set).start()
+    logger.flush()
+
+    assert webhook.descriptions() == [["0"], ["1"]]
+
+
+def test_caller_frame(webhook):
+    logger = DiscordLogger("app", webhook_url="http://discord/webhook", embed_func_name=True,
+                           embed_module_name=True, embed_line_number=True)
+    line = sys._getframe().f_lineno
+    logger.log("INFO", "log")
+    logger.info("info")
+    logger.flush()
+
+    fields = [{field['name']: field['value'] for field in embed['fields']}
+              for payload in webhook.payloads for embed in payload['embeds']]
+    assert fields == [
+        {'Function': "test_caller_frame", 'Module': "test_logger.py", 'Line': str(line + 1)},
+        {'Function': "test_caller_frame", 'Module': "test_logger.py", 'Line': str(line + 2)},
+    ]
+
+
+def test_caller_frame_sourceless(server, tmp_path):
+    url, payloads = server
+    shutil.copytree(os.path.dirname(discord_logger.__file__), tmp_path / "discord_logger",
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    compileall.compile_dir(tmp_path, legacy=True, quiet=1)
+    for path in (tmp_path / "discord_logger").glob("*.py"):
+        path.unlink()
+    script = textwrap.dedent(f"""
+        from discord_logger.logger import DiscordLogger
+
+        def caller():
+            DiscordLogger("app", webhook_url={url!r}, embed_func_name=True, embed_module_name=True).info("info")
+
+        caller()
+    """)
+    process = subprocess.run([sys.executable, "-c", script], env=dict(os.environ, PYTHONPATH=str(tmp_path)),
+                             capture_output=True, text=True, timeout=30)
+
+    assert process.returncode == 0, process.stderr
+    assert [{field['name']: field['value'] for field in embed['fields']}
+            for payload in payloads for embed in payload['embeds']] == [{'Function': "caller", 'Module': "<string>"}]
+
+
+def test_exit_delivery(server):
+    url, payloads = server
+    process = _run_script(f"""
+        from discord_logger.logger import DiscordLogger
+        DiscordLogger("app", webhook_url={url!r}).info("Goodbye")
+    """)
+
+    assert process.returncode == 0, process.stderr
+    assert "Failed to send log" not in process.stderr
+    assert [embed['description'] for payload in payloads for embed in payload['embeds']] == ["Goodbye"]
+
+
+def test_exit_delivery_from_thread(server):
+    url, payloads = server
+    process = _run_script(f"""
+        import threading, time
+        from discord_logger.logger import DiscordLogger
+        logger = DiscordLogger("app", webhook_url={url!r})
+        logger.info("main")
+
+        def work():
+            time.sleep(0.5)
+            logger.info("worker")
+
+        threading.Thread(target=work).start()
+    """)
+
+    assert process.returncode == 0, process.stderr
+    assert "Failed to send log" not in process.stderr
+    assert [embed['description'] for payload in payloads for embed in payload['embeds']] == ["main", "worker"]
+
+
+def test_log_after_stop(webhook):
+    logger = DiscordLogger("app", webhook_url="http://discord/webhook")
+    logger_module._manager.stop()
+    with pytest.warns(UserWarning, match="dispatcher is stopped"):
+        logger.info("late")
+
+
+def test_exit_timeout():
+    # Accepts the connections, never answers
+    unresponsive = socket.create_server(('127.0.0.1', 0))
+    try:
+        start = time.monotonic()
+        process = _run_script(f"""
+            from discord_logger import logger as logger_module
+            logger_module._EXIT_TIMEOUT_S = 1
+            logger = logger_module.DiscordLogger("app", webhook_url="http://localhost:{unresponsive.getsockname()[1]}/",
+                                                 batch_window_ms=0)
+            for i in range(40):
+                logger.info(f"{{i}}")
+        """)
+        elapsed = time.monotonic() - start
+    finally:
+        unresponsive.close()
+
+    assert process.returncode == 0, process.stderr
+    assert "queued log messages (timed out)" in process.stderr
+    assert elapsed < 5
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="os.fork is not available")
+def test_fork(server):
+    url, payloads = server
+    process = _run_script(f"""
+        import os, sys
+        from discord_logger.logger import DiscordLogger
+        logger = DiscordLogger("app", webhook_url={url!r})
+        logger.info("parent")
+        logger.flush()
+        pid = os.fork()
+        if pid == 0:
+            logger.info("child")
+            logger.flush()
+            logger.info("child exit")
+            sys.exit(0)
+        _, status = os.waitpid(pid, 0)
+        sys.exit(os.waitstatus_to_exitcode(status))
+    """)
+
+    assert process.returncode == 0, process.stderr
+    assert "Task was destroyed" not in process.stderr
+    assert sorted(embed['description'] for payload in payloads for embed in payload['embeds']) == [
+        "child", "child exit", "parent"]
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="os.fork is not available")
+def test_multiprocessing_fork(server):
+    url, payloads = server
+    process = _run_script(f"""
+        import multiprocessing, sys
+        from discord_logger.logger import DiscordLogger
+        logger = DiscordLogger("app", webhook_url={url!r})
+
+        def child():
+            # Not flushed, the child exits through os._exit
+            logger.info("child")
+
+        logger.info("parent")
+        logger.flush()
+        process = multiprocessing.get_context("fork").Process(target=child)
+        process.start()
+        process.join()
+        sys.exit(process.exitcode)
+    """)
+
+    assert process.returncode == 0, process.stderr
+    assert sorted(embed['description'] for payload in payloads for embed in payload['embeds']) == ["child", "parent"]
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="os.fork is not available")
+def test_fork_without_logging(server):
+    url, payloads = server
+    process = _run_script(f"""
+        import os, sys, threading
+        from discord_logger.logger import DiscordLogger
+        logger = DiscordLogger("app", webhook_url={url!r})
+        logger.info("parent")
+        logger.flush()
+        pid = os.fork()
+        if pid == 0:
+            # The event loop is only started when the child logs
+            sys.exit(any(thread.name.endswith("-EventLoop") for thread in threading.enumerate()))
+        _, status = os.waitpid(pid, 0)
+        sys.exit(os.waitstatus_to_exitcode(status))
+    """)
+
+    assert process.returncode == 0, process.stderr
+    assert "Task was destroyed" not in process.stderr
+    assert [embed['description'] for payload in payloads for embed in payload['embeds']] == ["parent"]
+
+
+@pytest.mark.parametrize("embed_mask", range(logger_module._ALL_FLAGS + 1))
+def test_compiled_message_fmt(webhook, embed_mask):
+    logger = DiscordLogger("a{pp}'\"", webhook_url="http://discord/webhook", payload_type=PayloadType.MESSAGE)
+    logger._set_embed_flag(logger_module._ALL_FLAGS, False)
+    logger._set_embed_flag(embed_mask, True)
+    log_record = LogRecord(LogLevel.ERROR, logger._app_name, "m {x} '\"", 1700000000.5, "Thread", "Process", 12,
+                           "func", "module.py")
+
+    assert logger._format_message(log_record) == logger_module.format_payload_message(log_record, logger._message_fmt)
+
+
+@pytest.mark.parametrize("level", ["WARNING", 30, LogLevel.WARNING])
+def test_parse_level(level):
+    assert logger_module._parse_level(level) is LogLevel.WARNING
+
+
+def test_parse_level_unknown(webhook):
+    with pytest.raises(ValueError):
+        logger_module._parse_level(35)
+    logger = DiscordLogger("app", webhook_url="http://discord/webhook", level="CRITICAL")
+    # Raised even when the level would be filtered out
+    with pytest.raises(ValueError):
+        logger.log(35, "message")
+
+
+def test_level_filter(webhook):
+    logger = DiscordLogger("app", webhook_url="http://discord/webhook", batch_window_ms=1000)
+    logger.level = "WARNING"
+    assert logger.level is LogLevel.WARNING
+    logger.info("info")
+    logger.log(20, "log info")
+    logger.warning("warning")
+    logger.log(LogLevel.ERROR, "log error")
+    logger.flush()
+
+    assert webhook.descriptions() == [["warning", "log error"]]
+
+
+def test_get_logger_concurrent():
+    manager = logger_module._LoggerManager()
+    created = []
+
+    def factory(name, **kwargs):
+        time.sleep(0.05)
+        created.append(name)
+        return object()
+
+    manager._factory = factory
+    barrier = threading.Barrier(8)
+    loggers = []
+
+    def get_logger():
+        barrier.wait()
+        loggers.append(manager.get_logger("app"))
+
+    threads = [threading.Thread(target=get_logger) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert created == ["app"]
+    assert all(logger is loggers[0] for logger in loggers)
+
+
+def test_get_logger_name_type():
+    with pytest.raises(TypeError):
+        logger_module._LoggerManager().get_logger(42)
+
+
+def test_get_logger_dispatcher_options(webhook, monkeypatch):
+    monkeypatch.setenv(logger_module._ENV_URL_KEY, "http://discord/webhook")
+    logger = discord_logger.get_logger("app", batch_window_ms=0, queue_size=4)
+
+    assert logger._worker._queue_size == 4
+    assert logger._worker._batch_window == 0
+    with pytest.raises(ValueError):
+        discord_logger.get_logger("other", queue_size=0)
+
+
+def test_dotenv_loaded_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(logger_module, "load_dotenv", lambda: calls.append(True) or False)
+    monkeypatch.setattr(logger_module, "_dotenv_found", None)
+    monkeypatch.setenv(logger_module._ENV_URL_KEY, "http://discord/webhook")
+
+    assert logger_module._get_webhook_url() == "http://discord/webhook"
+    assert logger_module._get_webhook_url() == "http://discord/webhook"
+    monkeypatch.delenv(logger_module._ENV_URL_KEY)
+    with pytest.raises(EnvironmentError, match="was not found"):
+        logger_module._get_webhook_url()
+    assert calls == [True]
+
+
+@pytest.mark.parametrize("embed_mask", range(logger_module._ALL_FLAGS + 1))
+def test_caller_info_collector(webhook, embed_mask):
+    logger = DiscordLogger("app", webhook_url="http://discord/webhook")
+    logger._set_embed_flag(embed_mask, True)
+    assert logger._collect_caller_info is logger_module._get_caller_info_collector(embed_mask)
+
+    line = sys._getframe().f_lineno
+    fields = logger.get_fields()
+
+    expected = {
+        'thread_name': threading.current_thread().name,
+        'process_name': "MainProcess",
+        'line_number': line + 1,
+        'func_name': "test_caller_info_collector",
+        'module_name': "test_logger.py",
+    }
+    assert fields == {k: v for k, v in expected.items() if embed_mask & logger_module._key_to_flag[k]}